@@ -0,0 +1,56 @@
+from sqlalchemy import text
+from mcp_server.utils.db import engine, Base, SessionLocal
+import mcp_server.models.db_models  # noqa: F401  (registers the models on Base)
+
+# One-off upgrade for databases created before the current ticket schema.
+# Safe to re-run: every step is guarded with IF NOT EXISTS / IF EXISTS.
+Base.metadata.create_all(bind=engine)
+print("✅ New tables created.")
+
+session = SessionLocal()
+
+try:
+    # Columns added for near-duplicate detection
+    session.execute(text("ALTER TABLE tickets ADD COLUMN IF NOT EXISTS created_at TIMESTAMP;"))
+    session.execute(text("UPDATE tickets SET created_at = now() AT TIME ZONE 'utc' WHERE created_at IS NULL;"))
+    session.execute(text(
+        "ALTER TABLE tickets ADD COLUMN IF NOT EXISTS duplicate_of INTEGER REFERENCES tickets (ticket_id);"
+    ))
+    session.execute(text("CREATE INDEX IF NOT EXISTS ix_tickets_duplicate_of ON tickets (duplicate_of);"))
+    session.commit()
+    print("✅ Added created_at and duplicate_of to tickets.")
+
+    # Closed-ticket archiving; duplicate_of drops its FK so originals can be archived first
+    session.execute(text("ALTER TABLE tickets ADD COLUMN IF NOT EXISTS closed_at TIMESTAMP;"))
+    session.execute(text("CREATE INDEX IF NOT EXISTS ix_tickets_closed_at ON tickets (closed_at);"))
+    session.execute(text("ALTER TABLE tickets DROP CONSTRAINT IF EXISTS tickets_duplicate_of_fkey;"))
+    session.commit()
+    print("✅ Added closed_at to tickets.")
+
+    # Move the large text columns out of the hot tickets row
+    has_text_columns = session.execute(text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'tickets' AND column_name = 'ticket_description';"
+    )).first()
+    if has_text_columns:
+        copied = session.execute(text(
+            "INSERT INTO ticket_content (ticket_id, ticket_description, email_draft) "
+            "SELECT ticket_id, ticket_description, email_draft FROM tickets "
+            "ON CONFLICT (ticket_id) DO NOTHING;"
+        )).rowcount
+        session.execute(text("ALTER TABLE tickets DROP COLUMN ticket_description, DROP COLUMN email_draft;"))
+        session.commit()
+        print(f"✅ Moved text of {copied} tickets into ticket_content.")
+
+        # DROP COLUMN only hides the data; rewrite the table so the old text is actually freed.
+        # VACUUM cannot run inside a transaction and locks tickets until it finishes.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM FULL tickets;"))
+        print("✅ Rewrote tickets table to reclaim space.")
+
+except Exception as e:
+    session.rollback()
+    print(f"❌ Error migrating tickets table: {e}")
+
+finally:
+    session.close()
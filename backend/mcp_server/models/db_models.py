@@ -1,4 +1,7 @@
-from sqlalchemy import Column, String, Integer, Text, Boolean
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import relationship
 from mcp_server.utils.db import Base
 
 class CRM(Base):
@@ -13,11 +16,55 @@ class Ticket(Base):
     ticket_id = Column(Integer, primary_key=True, autoincrement=True)
     customer_email = Column(String)
     issue_type = Column(String, nullable=True)
-    ticket_description = Column(Text)
     product_purchased = Column(String, nullable=True)
-    email_draft = Column(Text, nullable=True)
     status = Column(String, default="Open")
     jira_id = Column(String, nullable=True)
     email_sent = Column(Boolean, default=False)
     slack_sent = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    closed_at = Column(DateTime, nullable=True, index=True)
+    duplicate_of = Column(Integer, nullable=True, index=True)  # no FK: the original may be archived first
+
+    # Large text lives in ticket_content and is only loaded when accessed
+    content = relationship("TicketContent", uselist=False, lazy="select", cascade="all, delete-orphan")
+    ticket_description = association_proxy(
+        "content", "ticket_description",
+        creator=lambda description: TicketContent(ticket_description=description)
+    )
+    email_draft = association_proxy(
+        "content", "email_draft",
+        creator=lambda draft: TicketContent(email_draft=draft)
+    )
+
+class TicketContent(Base):
+    __tablename__ = "ticket_content"
+    ticket_id = Column(Integer, ForeignKey("tickets.ticket_id"), primary_key=True)
+    ticket_description = Column(Text)
+    email_draft = Column(Text, nullable=True)
+
+class TicketSignature(Base):
+    __tablename__ = "ticket_signatures"
+    ticket_id = Column(Integer, ForeignKey("tickets.ticket_id"), primary_key=True)
+    customer_email = Column(String, index=True)
+    product_purchased = Column(String, nullable=True)
+    minhash = Column(Text)  # comma-separated MinHash values
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
+# Closed tickets, range-partitioned by month of closed_at (partitions are created by the archiver)
+class TicketArchive(Base):
+    __tablename__ = "tickets_archive"
+    __table_args__ = {"postgresql_partition_by": "RANGE (closed_at)"}
+    ticket_id = Column(Integer, primary_key=True, autoincrement=False)
+    closed_at = Column(DateTime, primary_key=True)
+    customer_email = Column(String)
+    issue_type = Column(String, nullable=True)
+    product_purchased = Column(String, nullable=True)
+    status = Column(String)
+    jira_id = Column(String, nullable=True)
+    email_sent = Column(Boolean)
+    slack_sent = Column(Boolean)
+    created_at = Column(DateTime)
+    duplicate_of = Column(Integer, nullable=True)
+    ticket_description = Column(Text)
+    email_draft = Column(Text, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
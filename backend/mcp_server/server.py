@@ -2,6 +2,8 @@ import sys
 import os
 import logging
 import pandas as pd
+from contextlib import asynccontextmanager
+from datetime import datetime
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 from tenacity import retry, stop_after_attempt, wait_fixed
@@ -24,14 +26,23 @@ logger = logging.getLogger(__name__)
 CSV_PATH = os.getenv("CUSTOMER_QUERY_CSV", "../data/customer_query.csv")
 
 from mcp_server.utils.db import SessionLocal
-from mcp_server.models.db_models import CRM, Ticket
+from sqlalchemy.orm import load_only, joinedload
+from mcp_server.models.db_models import CRM, Ticket, TicketContent
 from mcp_server.services.llm_service import classify_issue_llm
 from mcp_server.services.jira_service import create_jira_ticket
 from mcp_server.services.slack_service import send_slack_message
 from mcp_server.services.draft_email_service import generate_email_draft
 from mcp_server.services.send_email_service import send_email
+from mcp_server.services.dedup_service import DEDUP_ENABLED, compute_minhash, duplicate_index
+from mcp_server.services.archive_service import start_archiver
 
-mcp = FastMCP("AI-Customer-Support-Orchestrator")
+@asynccontextmanager
+async def server_lifespan(server: FastMCP):
+    # Runs for `python server.py` and `mcp dev` alike; start_archiver() only starts one thread
+    start_archiver()
+    yield {}
+
+mcp = FastMCP("AI-Customer-Support-Orchestrator", lifespan=server_lifespan)
 
 
 @mcp.tool()
@@ -48,14 +59,34 @@ def process_query(customer_email: str, ticket_description: str, product_purchase
             status="Open"
         )
         db.add(new_ticket)
+        db.flush()
+
+        # Link near-duplicate resubmissions to the open ticket already being handled
+        signature = None
+        original_id = None
+        if DEDUP_ENABLED:
+            signature = compute_minhash(ticket_description, product_purchased)
+        if signature:
+            original_id = duplicate_index.find_duplicate(db, customer_email, product_purchased, signature)
+
+        # Issue type and Jira ID stay on the original; read them through duplicate_of
+        if original_id:
+            new_ticket.duplicate_of = original_id
+            new_ticket.status = "Duplicate"
+        elif signature:
+            duplicate_index.persist(db, new_ticket, signature)
+
         db.commit()
         db.refresh(new_ticket)
+        if signature and not original_id:
+            duplicate_index.register(new_ticket, signature)
 
         return {
             "ticket_id": new_ticket.ticket_id,
             "customer_email": customer_email,
             "customer_name": customer_name,
-            "status": new_ticket.status
+            "status": new_ticket.status,
+            "duplicate_of": new_ticket.duplicate_of
         }
     except Exception as e:
         logger.exception("Error in process_query")
@@ -63,20 +94,33 @@ def process_query(customer_email: str, ticket_description: str, product_purchase
     finally:
         db.close()
 
+def _skip_duplicate(ticket: Ticket) -> dict:
+    logger.info(f"Skipping ticket {ticket.ticket_id}: duplicate of ticket {ticket.duplicate_of}")
+    return {"ticket_id": ticket.ticket_id, "duplicate_of": ticket.duplicate_of, "skipped": True}
+
 @mcp.tool()
 def classify_issue(ticket_id: int) -> dict:
     db = SessionLocal()
     try:
-        ticket = db.query(Ticket).filter(Ticket.ticket_id == ticket_id).first()
+        ticket = (
+            db.query(Ticket)
+            .options(
+                load_only(Ticket.duplicate_of, Ticket.issue_type),
+                joinedload(Ticket.content).load_only(TicketContent.ticket_description)
+            )
+            .filter(Ticket.ticket_id == ticket_id)
+            .first()
+        )
         if not ticket:
             return {"error": "Ticket not found"}
+        if ticket.duplicate_of:
+            return _skip_duplicate(ticket)
 
         logger.info(f"Classifying issue for ticket {ticket_id}: {ticket.ticket_description}")
         issue_type = classify_issue_llm(ticket.ticket_description)
         logger.info(f"Issue classified as {issue_type} for ticket {ticket_id}")
         ticket.issue_type = issue_type
         db.commit()
-        db.refresh(ticket)
 
         return {"ticket_id": ticket_id, "issue_type": issue_type}
     except Exception as e:
@@ -89,9 +133,19 @@ def classify_issue(ticket_id: int) -> dict:
 def create_jira(ticket_id: int) -> dict:
     db = SessionLocal()
     try:
-        ticket = db.query(Ticket).filter(Ticket.ticket_id == ticket_id).first()
+        ticket = (
+            db.query(Ticket)
+            .options(
+                load_only(Ticket.duplicate_of, Ticket.customer_email, Ticket.issue_type, Ticket.product_purchased),
+                joinedload(Ticket.content).load_only(TicketContent.ticket_description)
+            )
+            .filter(Ticket.ticket_id == ticket_id)
+            .first()
+        )
         if not ticket:
             return {"error": "Ticket not found"}
+        if ticket.duplicate_of:
+            return _skip_duplicate(ticket)
 
         # Replace placeholder with actual product
         product = ticket.product_purchased or "the product"
@@ -110,7 +164,7 @@ def create_jira(ticket_id: int) -> dict:
         ticket.jira_id = jira_id
         db.commit()
 
-        return {"ticket_id": ticket.ticket_id, "jira_id": jira_id}
+        return {"ticket_id": ticket_id, "jira_id": jira_id}
 
     except Exception as e:
         logger.exception("Error in create_jira")
@@ -123,9 +177,19 @@ def notify_slack(ticket_id: int) -> dict:
     db = SessionLocal()
     try:
         # Fetch ticket and customer
-        ticket = db.query(Ticket).filter(Ticket.ticket_id == ticket_id).first()
+        ticket = (
+            db.query(Ticket)
+            .options(
+                load_only(Ticket.duplicate_of, Ticket.customer_email, Ticket.issue_type, Ticket.product_purchased, Ticket.jira_id),
+                joinedload(Ticket.content).load_only(TicketContent.ticket_description)
+            )
+            .filter(Ticket.ticket_id == ticket_id)
+            .first()
+        )
         if not ticket:
             return {"error": "Ticket not found"}
+        if ticket.duplicate_of:
+            return _skip_duplicate(ticket)
 
         customer = db.query(CRM).filter(CRM.customer_email == ticket.customer_email).first()
         customer_name = customer.customer_name if customer else "Unknown"
@@ -162,9 +226,19 @@ def notify_slack(ticket_id: int) -> dict:
 def draft_email(ticket_id: int) -> dict:
     db = SessionLocal()
     try:
-        ticket = db.query(Ticket).filter(Ticket.ticket_id == ticket_id).first()
+        ticket = (
+            db.query(Ticket)
+            .options(
+                load_only(Ticket.duplicate_of, Ticket.customer_email, Ticket.issue_type, Ticket.product_purchased, Ticket.jira_id),
+                joinedload(Ticket.content).load_only(TicketContent.ticket_id)
+            )
+            .filter(Ticket.ticket_id == ticket_id)
+            .first()
+        )
         if not ticket:
             return {"error": "Ticket not found"}
+        if ticket.duplicate_of:
+            return _skip_duplicate(ticket)
 
         customer = db.query(CRM).filter(CRM.customer_email == ticket.customer_email).first()
         customer_name = customer.customer_name if customer else "Customer"
@@ -189,10 +263,17 @@ def draft_email(ticket_id: int) -> dict:
 def send_email_tool(ticket_id: int) -> dict:
     db = SessionLocal()
     try:
-        ticket = db.query(Ticket).filter(Ticket.ticket_id == ticket_id).first()
+        ticket = (
+            db.query(Ticket)
+            .options(load_only(Ticket.duplicate_of, Ticket.customer_email, Ticket.issue_type, Ticket.product_purchased, Ticket.jira_id))
+            .filter(Ticket.ticket_id == ticket_id)
+            .first()
+        )
         if not ticket:
             logger.error(f"❌ Ticket not found for ID: {ticket_id}")
             return {"error": "Ticket not found"}
+        if ticket.duplicate_of:
+            return _skip_duplicate(ticket)
 
         customer = db.query(CRM).filter(CRM.customer_email == ticket.customer_email).first()
         first_name = (customer.customer_name or "Customer").split()[0] if customer else "Customer"
@@ -254,6 +335,42 @@ AI-Orchestrator
     finally:
         db.close()
 
+@mcp.tool()
+def close_ticket(ticket_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        ticket = (
+            db.query(Ticket)
+            .options(load_only(Ticket.status))
+            .filter(Ticket.ticket_id == ticket_id)
+            .with_for_update()
+            .first()
+        )
+        if not ticket:
+            return {"error": "Ticket not found"}
+        if ticket.status == "Closed":
+            # Keep the original closed_at; it drives archiving and the archive partition
+            return {"ticket_id": ticket_id, "status": "Closed", "closed_duplicates": 0}
+
+        closed_at = datetime.utcnow()
+        ticket.status = "Closed"
+        ticket.closed_at = closed_at
+
+        # Linked duplicates are resolved together with their original
+        closed_duplicates = (
+            db.query(Ticket)
+            .filter(Ticket.duplicate_of == ticket_id, Ticket.status != "Closed")
+            .update({Ticket.status: "Closed", Ticket.closed_at: closed_at}, synchronize_session=False)
+        )
+        db.commit()
+
+        return {"ticket_id": ticket_id, "status": "Closed", "closed_duplicates": closed_duplicates}
+    except Exception as e:
+        logger.exception("Error in close_ticket")
+        return {"error": str(e)}
+    finally:
+        db.close()
+
 @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
 @mcp.tool()
 def run_batch_pipeline(num_queries: int = 1) -> dict:
@@ -278,6 +395,15 @@ def run_batch_pipeline(num_queries: int = 1) -> dict:
                 results.append({"error": "Ticket creation failed", "email": customer_email})
                 continue
 
+            if ticket_info.get("duplicate_of"):
+                logger.info(f"🔗 Linked to open ticket {ticket_info['duplicate_of']}, skipping external calls")
+                results.append({
+                    "email": customer_email,
+                    "ticket_id": ticket_id,
+                    "duplicate_of": ticket_info["duplicate_of"]
+                })
+                continue
+
             classification = classify_issue(ticket_id)
             logger.info(f"🧠 Classification done: {classification}")
 
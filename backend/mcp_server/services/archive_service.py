@@ -0,0 +1,116 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import text, select, insert, delete, literal, DateTime
+
+from mcp_server.utils.db import SessionLocal
+from mcp_server.models.db_models import Ticket, TicketContent, TicketSignature, TicketArchive
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
+ARCHIVE_AFTER_HOURS = float(os.getenv("ARCHIVE_AFTER_HOURS", 24))
+ARCHIVE_BATCH_SIZE = max(1, int(os.getenv("ARCHIVE_BATCH_SIZE", 500)))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", 600))
+
+_archiver_thread = None
+_archiver_lock = threading.Lock()
+
+_ARCHIVE_COLUMNS = [
+    "ticket_id", "closed_at", "customer_email", "issue_type", "product_purchased", "status",
+    "jira_id", "email_sent", "slack_sent", "created_at", "duplicate_of",
+    "ticket_description", "email_draft", "archived_at",
+]
+
+
+def _month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1)
+
+
+def _next_month(ts: datetime) -> datetime:
+    return datetime(ts.year + 1, 1, 1) if ts.month == 12 else datetime(ts.year, ts.month + 1, 1)
+
+
+def ensure_archive_partition(db, closed_at: datetime):
+    start = _month_start(closed_at)
+    end = _next_month(start)
+    partition = f"{TicketArchive.__tablename__}_{start:%Y_%m}"
+    db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {TicketArchive.__tablename__} "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    ))
+
+
+def archive_closed_tickets(db, older_than_hours: float = ARCHIVE_AFTER_HOURS, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Moves one batch of closed tickets into tickets_archive. Returns the number of tickets moved."""
+    cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
+    rows = (
+        db.query(Ticket.ticket_id, Ticket.closed_at)
+        .filter(Ticket.status == "Closed", Ticket.closed_at < cutoff)
+        .order_by(Ticket.closed_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not rows:
+        return 0
+
+    ticket_ids = [row.ticket_id for row in rows]
+    for month in {_month_start(row.closed_at) for row in rows}:
+        ensure_archive_partition(db, month)
+
+    source = (
+        select(
+            Ticket.ticket_id, Ticket.closed_at, Ticket.customer_email, Ticket.issue_type,
+            Ticket.product_purchased, Ticket.status, Ticket.jira_id, Ticket.email_sent,
+            Ticket.slack_sent, Ticket.created_at, Ticket.duplicate_of,
+            TicketContent.ticket_description, TicketContent.email_draft,
+            literal(datetime.utcnow(), DateTime),
+        )
+        .outerjoin(TicketContent, TicketContent.ticket_id == Ticket.ticket_id)
+        .where(Ticket.ticket_id.in_(ticket_ids))
+    )
+    db.execute(insert(TicketArchive).from_select(_ARCHIVE_COLUMNS, source))
+
+    # Drop everything still pointing at the moved rows before deleting them
+    db.execute(delete(TicketSignature).where(TicketSignature.ticket_id.in_(ticket_ids)))
+    db.execute(delete(TicketContent).where(TicketContent.ticket_id.in_(ticket_ids)))
+    db.execute(delete(Ticket).where(Ticket.ticket_id.in_(ticket_ids)))
+    db.commit()
+
+    logger.info(f"📦 Archived {len(ticket_ids)} closed tickets")
+    return len(ticket_ids)
+
+
+def _archiver_loop():
+    while True:
+        db = SessionLocal()
+        try:
+            # Keep going while full batches come back; a short batch means the backlog is drained
+            while archive_closed_tickets(db) >= ARCHIVE_BATCH_SIZE:
+                pass
+        except Exception:
+            db.rollback()
+            logger.exception("❌ Ticket archiver run failed")
+        finally:
+            db.close()
+        time.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+def start_archiver():
+    """Starts the background archiver once per process; later calls return the running thread."""
+    global _archiver_thread
+    if not ARCHIVE_ENABLED:
+        logger.info("Ticket archiver disabled")
+        return None
+    with _archiver_lock:
+        if _archiver_thread and _archiver_thread.is_alive():
+            return _archiver_thread
+        _archiver_thread = threading.Thread(target=_archiver_loop, name="ticket-archiver", daemon=True)
+        _archiver_thread.start()
+    logger.info(f"Ticket archiver started (every {ARCHIVE_INTERVAL_SECONDS}s, closed > {ARCHIVE_AFTER_HOURS}h)")
+    return _archiver_thread
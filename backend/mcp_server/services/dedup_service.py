@@ -0,0 +1,178 @@
+import os
+import re
+import random
+import zlib
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import delete
+
+from mcp_server.models.db_models import Ticket, TicketSignature
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Tunables
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", 0.8))
+DEDUP_WINDOW_HOURS = float(os.getenv("DEDUP_WINDOW_HOURS", 72))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", 128))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", 32))
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures stored in the DB stay comparable across restarts
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(DEDUP_NUM_PERM)
+]
+_ROWS_PER_BAND = max(1, DEDUP_NUM_PERM // DEDUP_BANDS)
+
+
+def _shingles(text: str, product: str) -> set:
+    """Word n-gram shingles of the description, with the product placeholder filled in."""
+    text = text.replace("{product_purchased}", product or "")
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def compute_minhash(text: str, product: str):
+    """Returns the MinHash signature of the description, or None if it has no words to compare."""
+    shingle_hashes = [zlib.crc32(s.encode("utf-8")) for s in _shingles(text or "", product)]
+    if not shingle_hashes:
+        return None
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in shingle_hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_similarity(sig_a: list, sig_b: list) -> float:
+    matches = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return matches / len(sig_a)
+
+
+def _bands(signature: list) -> list:
+    return [
+        (i, tuple(signature[i:i + _ROWS_PER_BAND]))
+        for i in range(0, len(signature), _ROWS_PER_BAND)
+    ]
+
+
+def _scope(customer_email: str, product: str) -> tuple:
+    return ((customer_email or "").strip().lower(), (product or "").strip().lower())
+
+
+class DuplicateIndex:
+    """In-memory LSH index of ticket MinHash signatures, scoped per customer and product."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._buckets = {}      # (scope, band_no, band) -> {ticket_id}
+        self._entries = {}      # ticket_id -> (scope, signature, created_at)
+        self._by_age = []       # heap of (created_at, ticket_id), oldest first
+
+    def _add(self, ticket_id: int, scope: tuple, signature: list, created_at: datetime):
+        self._entries[ticket_id] = (scope, signature, created_at)
+        heapq.heappush(self._by_age, (created_at, ticket_id))
+        for band_no, band in _bands(signature):
+            self._buckets.setdefault((scope, band_no, band), set()).add(ticket_id)
+
+    def _remove(self, ticket_id: int):
+        entry = self._entries.pop(ticket_id, None)
+        if not entry:
+            return
+        scope, signature, _ = entry
+        for band_no, band in _bands(signature):
+            key = (scope, band_no, band)
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(ticket_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _evict_expired(self, cutoff: datetime) -> int:
+        evicted = 0
+        while self._by_age and self._by_age[0][0] < cutoff:
+            _, ticket_id = heapq.heappop(self._by_age)
+            self._remove(ticket_id)
+            evicted += 1
+        return evicted
+
+    def _purge_stored(self, db, cutoff: datetime):
+        # Signatures outside the window are never read again; drop them with the caller's transaction
+        db.execute(delete(TicketSignature).where(TicketSignature.created_at < cutoff))
+
+    def _ensure_loaded(self, db):
+        if self._loaded:
+            return
+        cutoff = datetime.utcnow() - timedelta(hours=DEDUP_WINDOW_HOURS)
+        self._purge_stored(db, cutoff)
+        rows = db.query(TicketSignature).filter(TicketSignature.created_at >= cutoff).all()
+        for row in rows:
+            signature = [int(v) for v in row.minhash.split(",")]
+            if len(signature) != DEDUP_NUM_PERM:
+                continue
+            self._add(row.ticket_id, _scope(row.customer_email, row.product_purchased), signature, row.created_at)
+        self._loaded = True
+        logger.info(f"Loaded {len(self._entries)} ticket signatures into duplicate index")
+
+    def find_duplicate(self, db, customer_email: str, product: str, signature: list):
+        """Returns the ID of the open ticket this one duplicates, or None."""
+        cutoff = datetime.utcnow() - timedelta(hours=DEDUP_WINDOW_HOURS)
+        scope = _scope(customer_email, product)
+        with self._lock:
+            self._ensure_loaded(db)
+            if self._evict_expired(cutoff):
+                self._purge_stored(db, cutoff)
+            candidates = set()
+            for band_no, band in _bands(signature):
+                candidates |= self._buckets.get((scope, band_no, band), set())
+            scored = sorted(
+                ((estimate_similarity(signature, self._entries[t][1]), t) for t in candidates),
+                reverse=True
+            )
+
+        for similarity, ticket_id in scored:
+            if similarity < DEDUP_SIMILARITY_THRESHOLD:
+                break
+            is_open = (
+                db.query(Ticket.ticket_id)
+                .filter(Ticket.ticket_id == ticket_id, Ticket.status == "Open")
+                .first()
+            )
+            if is_open:
+                logger.info(f"Ticket matches open ticket {ticket_id} (similarity {similarity:.2f})")
+                return ticket_id
+        return None
+
+    def persist(self, db, ticket: Ticket, signature: list):
+        """Stages the signature row on the session; call register() once committed."""
+        db.add(TicketSignature(
+            ticket_id=ticket.ticket_id,
+            customer_email=ticket.customer_email,
+            product_purchased=ticket.product_purchased,
+            minhash=",".join(str(v) for v in signature),
+            created_at=ticket.created_at
+        ))
+
+    def register(self, ticket: Ticket, signature: list):
+        with self._lock:
+            if self._loaded:
+                self._add(
+                    ticket.ticket_id,
+                    _scope(ticket.customer_email, ticket.product_purchased),
+                    signature,
+                    ticket.created_at or datetime.utcnow()
+                )
+
+
+duplicate_index = DuplicateIndex()